@@ -0,0 +1,870 @@
+__author__ = 'inclyped et al.'
+
+### IMPORT STATEMENTS ###
+import unittest # import unittesting library.
+import os # import operating system utilities for file paths.
+import sys # import system streams for reports.
+import argparse # import command line argument parsing.
+import contextlib # import context manager utilities.
+import io # import in-memory text streams.
+import tempfile # import temporary directories.
+import typing # import typed record types.
+import sqlite3 # import the catalogue database.
+import gzip # import gzip compressed files for the tests.
+import array # import compact arrays of numbers.
+import mmap # import memory mapped files.
+import struct # import unpacking of the zip member headers.
+import zipfile # import the member table of columnar catalogues.
+import math # import the product of array shapes.
+import itertools # import iterator slicing.
+import collections # import counting of shared melody n-grams.
+import heapq # import selection of the best melody candidates.
+
+# the catalogues are filled by the conversion stages of the interpreter.
+# NumPy is imported by import_numpy(), only when a columnar catalogue is used.
+from ringtone_interpreter import ( ENGINES, PROFILER, BINARY_NOTE, READ_ERRORS, GOLDEN_INPUT_FILES, NUMPY_AVAILABLE, import_numpy, open_song_file,
+                                   iterate_ringtones, convert_song_file, Ringtone )
+
+### CATALOGUE DATABASE ###
+# one row per valid ringtone. The notes are packed like the binary stream, and the duration is the length of
+# the song in seconds, so that both titles and durations can be searched through their indexes.
+CATALOGUE_SCHEMA : str = """
+CREATE TABLE IF NOT EXISTS songs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    defaults TEXT NOT NULL,
+    note_count INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    notes BLOB NOT NULL
+);
+"""
+CATALOGUE_INDEXES : str = """
+CREATE INDEX IF NOT EXISTS songs_title ON songs ( title );
+CREATE INDEX IF NOT EXISTS songs_duration ON songs ( duration );
+CREATE INDEX IF NOT EXISTS songs_source ON songs ( source, position );
+"""
+CATALOGUE_FETCH_ROWS : int = 256
+
+class CatalogueSong( typing.NamedTuple ):
+    """
+    
+    CatalogueSong is a ringtone read back from the catalogue database, with its notes unpacked.
+    
+    """
+    id : int
+    source : str
+    position : int
+    title : str
+    defaultValues : str
+    duration : float
+    notes : list
+
+def open_catalogue( databaseFileName : str ) -> sqlite3.Connection:
+    """
+    
+    Description:
+    Opens, and creates if needed, a catalogue database. It uses write-ahead logging, so that readers are
+    not blocked while songs are being stored.
+    
+    Parameters:
+    @param databaseFileName: The name of the database file.
+    
+    Returns:
+    @return sqlite3.Connection: The connection to the database.
+    
+    """
+    connection : sqlite3.Connection = sqlite3.connect( databaseFileName )
+    connection.execute( "PRAGMA journal_mode=WAL" )
+    connection.execute( "PRAGMA synchronous=NORMAL" )
+    connection.executescript( CATALOGUE_SCHEMA )
+    
+    return connection
+
+def store_song_file( connection : sqlite3.Connection, fileName : str, engineName : str = 'reference' ) -> int:
+    """
+    
+    Description:
+    Stores every valid ringtone of a song file in the catalogue, replacing the songs stored from it before.
+    The rows are generated while the file is read and inserted by a single executemany() call inside a single
+    transaction; the indexes are created afterwards, when they do not exist yet.
+    
+    Parameters:
+    @param connection: The connection returned by open_catalogue().
+    @param fileName: The name of the song file.
+    @param engineName: The name of the engine used for every stage of the conversion.
+    
+    Returns:
+    @return int: The number of songs stored.
+    
+    """
+    source : str = os.path.abspath( fileName )
+    
+    try:
+        songFile = open_song_file( fileName, 'r' )
+    except FileNotFoundError: # in case the file was not found.
+        raise FileNotFoundError(f'FILE {fileName} NOT FOUND')
+    except IOError: # in case of any errors in working with the file.
+        raise IOError(f"COULD NOT READ FILE {fileName}")
+    
+    # the rows are produced one ringtone at a time, so the whole file is never held in memory.
+    rows = ( ( source, position, ringtone.title, ringtone.defaultValues, len( ringtone.notes ), sum( duration for duration, _ in ringtone.notes ),
+               b''.join( [ BINARY_NOTE.pack( duration, playBack ) for duration, playBack in ringtone.notes ] ) )
+             for position, ringtone in enumerate( iterate_ringtones( songFile, engineName ) ) )
+    
+    # the file is read while the rows are inserted, so an error reading it rolls the whole file back.
+    with songFile, PROFILER.stage( 'store_catalogue' ), connection:
+        connection.execute( "DELETE FROM songs WHERE source = ?", ( source, ) )
+        try:
+            storedSongs : int = connection.executemany( "INSERT INTO songs ( source, position, title, defaults, note_count, duration, notes ) VALUES ( ?, ?, ?, ?, ?, ?, ? )", rows ).rowcount
+        except READ_ERRORS: # in case of any errors in working with the file, such as a corrupt compressed file.
+            raise IOError(f"COULD NOT READ FILE {fileName}")
+    
+    connection.executescript( CATALOGUE_INDEXES )
+    
+    return storedSongs
+
+def query_catalogue( connection : sqlite3.Connection, titlePrefix : str = None, minimumDuration : float = None,
+                     maximumDuration : float = None, source : str = None, limit : int = None ):
+    """
+    
+    Description:
+    Yields the stored songs that match every given condition, in the order they were stored. Rows are fetched
+    a few at a time, so a query over the whole catalogue never holds more than a handful of songs. Title
+    prefixes are matched as a range of the title index, and are case sensitive.
+    
+    Parameters:
+    @param connection: The connection returned by open_catalogue().
+    @param titlePrefix: The text the titles start with.
+    @param minimumDuration: The shortest length of a song, in seconds.
+    @param maximumDuration: The longest length of a song, in seconds.
+    @param source: The song file the songs were stored from.
+    @param limit: The largest number of songs to return.
+    
+    Returns:
+    @return generator: The CatalogueSong records.
+    
+    """
+    conditions : list = []
+    parameters : list = []
+    
+    if titlePrefix:
+        conditions.append( "title >= ? AND title < ?" )
+        parameters += [ titlePrefix, titlePrefix + '\U0010ffff' ]
+    if minimumDuration is not None:
+        conditions.append( "duration >= ?" )
+        parameters.append( minimumDuration )
+    if maximumDuration is not None:
+        conditions.append( "duration <= ?" )
+        parameters.append( maximumDuration )
+    if source is not None:
+        conditions.append( "source = ?" )
+        parameters.append( os.path.abspath( source ) )
+    
+    query : str = "SELECT id, source, position, title, defaults, duration, notes FROM songs"
+    query += ( " WHERE " + " AND ".join( conditions ) if conditions else "" ) + " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ?"
+        parameters.append( limit )
+    
+    cursor : sqlite3.Cursor = connection.execute( query, parameters )
+    while True:
+        rows : list = cursor.fetchmany( CATALOGUE_FETCH_ROWS )
+        if not rows:
+            return
+        
+        for songId, songSource, position, title, defaultValues, duration, notes in rows:
+            yield CatalogueSong( songId, songSource, position, title, defaultValues, duration, [ list( note ) for note in BINARY_NOTE.iter_unpack( notes ) ] )
+
+### COLUMNAR CATALOGUE ###
+# the arrays of a columnar catalogue. Song i has the notes songOffsets[i] to songOffsets[i+1] and the UTF-8 title
+# bytes titleOffsets[i] to titleOffsets[i+1].
+COLUMNAR_ARRAYS : tuple = ( 'durations', 'pitches', 'song_offsets', 'titles', 'title_offsets' )
+COLUMNAR_REST : int = -400
+
+def export_columnar_catalogue( fileName : str, outputFileName : str = 'catalogue.npz', engineName : str = 'reference' ) -> int:
+    """
+    
+    Description:
+    Writes every valid ringtone of a song file to an uncompressed ".npz" file as flat arrays: the durations
+    and pitches of all notes, the offset of every song's first note and the offsets of the titles in a single
+    byte array. The arrays are filled one ringtone at a time as the file is read.
+    
+    Parameters:
+    @param fileName: The name of the song file.
+    @param outputFileName: The name of the ".npz" file.
+    @param engineName: The name of the engine used for every stage of the conversion.
+    
+    Returns:
+    @return int: The number of songs exported.
+    
+    """
+    np = import_numpy( "EXPORT A COLUMNAR CATALOGUE" )
+    
+    durations : array.array = array.array( 'd' )
+    pitches : array.array = array.array( 'i' )
+    songOffsets : array.array = array.array( 'q', [0] )
+    titles : bytearray = bytearray()
+    titleOffsets : array.array = array.array( 'q', [0] )
+    
+    try:
+        songFile = open_song_file( fileName, 'r' )
+    except FileNotFoundError: # in case the file was not found.
+        raise FileNotFoundError(f'FILE {fileName} NOT FOUND')
+    except IOError: # in case of any errors in working with the file.
+        raise IOError(f"COULD NOT READ FILE {fileName}")
+    
+    with songFile, PROFILER.stage( 'export_columnar' ):
+        try:
+            for ringtone in iterate_ringtones( songFile, engineName ):
+                for duration, playBack in ringtone.notes:
+                    durations.append( duration )
+                    pitches.append( playBack )
+                songOffsets.append( len(durations) )
+                
+                titles += ringtone.title.encode( 'utf-8' )
+                titleOffsets.append( len(titles) )
+        
+        except READ_ERRORS: # in case of any errors in working with the file, such as a corrupt compressed file.
+            raise IOError(f"COULD NOT READ FILE {fileName}")
+        
+        # the members are stored uncompressed, so that load_columnar_catalogue() can map them.
+        np.savez( outputFileName, durations = np.frombuffer( durations, np.float64 ), pitches = np.frombuffer( pitches, np.int32 ),
+                  song_offsets = np.frombuffer( songOffsets, np.int64 ), titles = np.frombuffer( titles, np.uint8 ),
+                  title_offsets = np.frombuffer( titleOffsets, np.int64 ) )
+    
+    return len(songOffsets) - 1
+
+class ColumnarCatalogue:
+    """
+    
+    ColumnarCatalogue class holds the flat arrays of a columnar catalogue, usually mapped straight from the
+    ".npz" file, and answers vectorised queries over every note of every song.
+    
+    """
+    __slots__ = ( 'durations', 'pitches', 'songOffsets', 'titleBytes', 'titleOffsets' )
+    
+    def __init__( self, durations, pitches, songOffsets, titleBytes, titleOffsets ):
+        self.durations = durations
+        self.pitches = pitches
+        self.songOffsets = songOffsets
+        self.titleBytes = titleBytes
+        self.titleOffsets = titleOffsets
+    
+    def __len__( self ) -> int:
+        return len(self.songOffsets) - 1
+    
+    def title( self, index : int ) -> str:
+        return bytes( self.titleBytes[ self.titleOffsets[index] : self.titleOffsets[index + 1] ] ).decode( 'utf-8' )
+    
+    def titles( self ) -> list:
+        return [ self.title( index ) for index in range( len(self) ) ]
+    
+    def notes( self, index : int ) -> list:
+        """
+        
+        Description:
+        Returns the notes of a song the way the conversion functions produce them.
+        
+        Parameters:
+        @param index: The position of the song in the catalogue.
+        
+        Returns:
+        @return list: The [duration, playback] pairs of the song.
+        
+        """
+        start, end = int( self.songOffsets[index] ), int( self.songOffsets[index + 1] )
+        
+        return [ list( note ) for note in zip( self.durations[start:end].tolist(), self.pitches[start:end].tolist() ) ]
+    
+    def song_durations( self ):
+        """
+        
+        Description:
+        Returns the length of every song in seconds, from a single running sum over all notes. The lengths can
+        differ from the note start times of the HTML file in the last few bits.
+        
+        Returns:
+        @return numpy.ndarray: The length of every song.
+        
+        """
+        np = import_numpy( "QUERY A COLUMNAR CATALOGUE" )
+        runningSum = np.concatenate( ( [0.0], np.cumsum( self.durations ) ) )
+        
+        return runningSum[ self.songOffsets[1:] ] - runningSum[ self.songOffsets[:-1] ]
+    
+    def pitch_histogram( self ) -> tuple:
+        """
+        
+        Description:
+        Counts how often every playback number is played across the catalogue, leaving out rests.
+        
+        Returns:
+        @return tuple: The playback numbers in ascending order, and how often each is played.
+        
+        """
+        np = import_numpy( "QUERY A COLUMNAR CATALOGUE" )
+        return np.unique( self.pitches[ self.pitches != COLUMNAR_REST ], return_counts = True )
+    
+    def duration_histogram( self ) -> tuple:
+        """
+        
+        Description:
+        Counts how often every note duration occurs across the catalogue, rests included.
+        
+        Returns:
+        @return tuple: The note durations in ascending order, and how often each occurs.
+        
+        """
+        np = import_numpy( "QUERY A COLUMNAR CATALOGUE" )
+        return np.unique( self.durations, return_counts = True )
+    
+    def pitch_ranges( self ) -> tuple:
+        """
+        
+        Description:
+        Finds the lowest and highest playback number of every song, leaving out rests. Songs without any
+        pitched note get the rest value for both.
+        
+        Returns:
+        @return tuple: The lowest and the highest playback number of every song.
+        
+        """
+        np = import_numpy( "QUERY A COLUMNAR CATALOGUE" )
+        pitched = self.pitches != COLUMNAR_REST
+        pitchedNotes = self.pitches[pitched]
+        
+        # the number of pitched notes before every song boundary gives the boundaries within pitchedNotes.
+        pitchedOffsets = np.searchsorted( np.flatnonzero( pitched ), self.songOffsets )
+        hasPitches = pitchedOffsets[1:] > pitchedOffsets[:-1]
+        lowest = np.full( len(self), COLUMNAR_REST, np.int32 )
+        highest = np.full( len(self), COLUMNAR_REST, np.int32 )
+        
+        # songs without pitched notes are skipped, so each reduction ends where the next song with pitches starts.
+        if hasPitches.any():
+            starts = pitchedOffsets[:-1][hasPitches]
+            lowest[hasPitches] = np.minimum.reduceat( pitchedNotes, starts )
+            highest[hasPitches] = np.maximum.reduceat( pitchedNotes, starts )
+        
+        return lowest, highest
+
+def load_columnar_catalogue( fileName : str ) -> ColumnarCatalogue:
+    """
+    
+    Description:
+    Maps a catalogue written by export_columnar_catalogue() without reading it. The offset of every array
+    is found from the member table of the ".npz" file and the header of the ".npy" member, and the arrays
+    are views over a single read-only memory map of the file.
+    
+    Parameters:
+    @param fileName: The name of the ".npz" file.
+    
+    Returns:
+    @return ColumnarCatalogue: The catalogue, backed by the file.
+    
+    """
+    np = import_numpy( "LOAD A COLUMNAR CATALOGUE" )
+    
+    arrays : dict = {}
+    
+    try:
+        catalogueFile = open( fileName, 'rb' )
+    except FileNotFoundError: # in case the file was not found.
+        raise FileNotFoundError(f'FILE {fileName} NOT FOUND')
+    
+    with catalogueFile, zipfile.ZipFile( catalogueFile ) as archive:
+        fileMap : mmap.mmap = mmap.mmap( catalogueFile.fileno(), 0, access = mmap.ACCESS_READ )
+        
+        for member in archive.infolist():
+            name : str = member.filename.removesuffix( '.npy' )
+            if name not in COLUMNAR_ARRAYS:
+                continue
+            if member.compress_type != zipfile.ZIP_STORED: # in case the archive was written with savez_compressed().
+                raise ValueError(f"COMPRESSED ARRAY {name} CAN NOT BE MAPPED")
+            
+            # the local header repeats the name and has its own extra field, so the data starts after both.
+            nameLength, extraLength = struct.unpack_from( '<HH', fileMap, member.header_offset + 26 )
+            catalogueFile.seek( member.header_offset + 30 + nameLength + extraLength )
+            
+            version : tuple = np.lib.format.read_magic( catalogueFile )
+            if version == ( 1, 0 ):
+                shape, fortranOrder, dtype = np.lib.format.read_array_header_1_0( catalogueFile )
+            elif version == ( 2, 0 ):
+                shape, fortranOrder, dtype = np.lib.format.read_array_header_2_0( catalogueFile )
+            else: # in case of a format this function does not know.
+                raise ValueError(f"UNKNOWN NPY VERSION {version} FOR ARRAY {name}")
+            
+            arrays[name] = np.frombuffer( fileMap, dtype, math.prod( shape ), catalogueFile.tell() ).reshape( shape )
+    
+    if len(arrays) != len(COLUMNAR_ARRAYS): # in case the file is not a columnar catalogue.
+        raise ValueError(f"FILE {fileName} IS NOT A COLUMNAR CATALOGUE")
+    
+    return ColumnarCatalogue( *( arrays[name] for name in COLUMNAR_ARRAYS ) )
+
+### MELODY INDEX ###
+# a melody is the sequence of intervals between its pitched notes, so it matches in any key and at any tempo.
+# MELODY_NGRAM intervals make up one n-gram, packed into an integer: 8 bits per interval and the number of
+# intervals above them, so melodies shorter than an n-gram still get a single n-gram of their own.
+MELODY_NGRAM : int = 3
+MELODY_MAX_INTERVAL : int = 18 # an octave and a half, so any wider leap counts as the same leap.
+MELODY_REST : int = -400
+MELODY_CANDIDATES : int = 8
+MELODY_COMMON_FRACTION : float = 0.05
+MELODY_COMMON_MINIMUM : int = 1000
+
+class MelodyMatch( typing.NamedTuple ):
+    """
+    
+    MelodyMatch is a song found by MelodyIndex.search_similar(), with the share of n-grams it has in common with the query.
+    
+    """
+    score : float
+    song : int
+    title : str
+
+def melody_ngrams( notes : list ) -> array.array:
+    """
+    
+    Description:
+    Returns the distinct interval n-grams of a song in ascending order. Rests are skipped, so a melody with
+    rests in between still matches the same melody without them; intervals are clamped to MELODY_MAX_INTERVAL,
+    an octave and a half, either way. A song with fewer than two pitched notes has no melody, and no n-grams.
+    
+    Parameters:
+    @param notes: The [duration, playback] pairs of the song.
+    
+    Returns:
+    @return array.array: The packed n-grams.
+    
+    """
+    pitches : list = [ playBack for duration, playBack in notes if playBack != MELODY_REST ]
+    intervals : list = [ min( max( following - current, -MELODY_MAX_INTERVAL ), MELODY_MAX_INTERVAL ) + 128 for current, following in zip( pitches, pitches[1:] ) ]
+    
+    # a melody shorter than an n-gram is a single n-gram of the intervals it has.
+    length : int = min( len(intervals), MELODY_NGRAM )
+    ngrams : set = set()
+    for start in range( max( len(intervals) - MELODY_NGRAM + 1, 1 ) if intervals else 0 ):
+        key : int = length
+        for interval in intervals[ start : start + length ]:
+            key = ( key << 8 ) | interval
+        ngrams.add( key )
+    
+    return array.array( 'Q', sorted( ngrams ) )
+
+class MelodyIndex:
+    """
+    
+    MelodyIndex class finds the songs whose melodies are most like a query. An inverted index from every
+    n-gram to the songs that contain it gives the candidates, and the candidates sharing the most n-grams
+    are ranked again by the share of all their n-grams they have in common with the query.
+    
+    """
+    __slots__ = ( 'titles', 'ngrams', 'ngramOffsets', 'postings' )
+    
+    def __init__( self ):
+        self.titles : list = []
+        self.ngrams : array.array = array.array( 'Q' )
+        self.ngramOffsets : array.array = array.array( 'q', [0] )
+        self.postings : dict = {}
+    
+    def __len__( self ) -> int:
+        return len(self.titles)
+    
+    def add( self, title : str, notes : list ) -> int:
+        """
+        
+        Description:
+        Adds a song to the index.
+        
+        Parameters:
+        @param title: The title of the song.
+        @param notes: The [duration, playback] pairs of the song.
+        
+        Returns:
+        @return int: The number of the song in the index.
+        
+        """
+        song : int = len(self.titles)
+        ngrams : array.array = melody_ngrams( notes )
+        
+        self.titles.append( title )
+        self.ngrams.extend( ngrams )
+        self.ngramOffsets.append( len(self.ngrams) )
+        for ngram in ngrams:
+            if ngram not in self.postings:
+                self.postings[ngram] = array.array( 'I' )
+            self.postings[ngram].append( song )
+        
+        return song
+    
+    def song_ngrams( self, song : int ) -> array.array:
+        return self.ngrams[ self.ngramOffsets[song] : self.ngramOffsets[song + 1] ]
+    
+    def search_similar( self, notes : list, k : int = 10 ) -> list:
+        """
+        
+        Description:
+        Finds the k songs most like the given notes. Only the postings of n-grams found in at most
+        MELODY_COMMON_FRACTION of the songs are counted, unless the query has no other n-grams, so a
+        query never walks the postings of n-grams that nearly every song has. The MELODY_CANDIDATES * k
+        songs with the best Jaccard similarity over the counted n-grams are then scored again over all of
+        their n-grams.
+        
+        Parameters:
+        @param notes: The [duration, playback] pairs of the query.
+        @param k: The largest number of songs to return.
+        
+        Returns:
+        @return list: The MelodyMatch records, most similar first, and in index order for equal scores.
+        
+        """
+        queryNgrams : set = set( melody_ngrams( notes ) )
+        postings : list = sorted( ( self.postings[ngram] for ngram in queryNgrams if ngram in self.postings ), key = len )
+        if not postings or k <= 0:
+            return []
+        
+        commonLimit : int = max( MELODY_COMMON_MINIMUM, int( len(self) * MELODY_COMMON_FRACTION ) )
+        sharedCounts : collections.Counter = collections.Counter()
+        for songs in itertools.takewhile( lambda songs : len(songs) <= commonLimit, postings ):
+            sharedCounts.update( songs )
+        if not sharedCounts: # in case every n-gram of the query is common, all of them are counted.
+            for songs in postings:
+                sharedCounts.update( songs )
+        
+        # the counts leave out the common n-grams, so re-ranking counts every n-gram of the candidates again.
+        offsets : array.array = self.ngramOffsets
+        candidates : list = heapq.nlargest( MELODY_CANDIDATES * k, sharedCounts.items(),
+                                            key = lambda item : item[1] / ( len(queryNgrams) + offsets[item[0] + 1] - offsets[item[0]] - item[1] ) )
+        matches : list = []
+        for song, count in candidates:
+            songNgrams : array.array = self.song_ngrams( song )
+            shared : int = sum( ngram in queryNgrams for ngram in songNgrams )
+            matches.append( MelodyMatch( shared / ( len(queryNgrams) + len(songNgrams) - shared ), song, self.titles[song] ) )
+        
+        matches.sort( key = lambda match : ( -match.score, match.song ) )
+        
+        return matches[:k]
+
+def build_melody_index( fileNames : list, engineName : str = 'reference' ) -> MelodyIndex:
+    """
+    
+    Description:
+    Builds a melody index over every valid ringtone of the given song files, numbered in order across the files.
+    
+    Parameters:
+    @param fileNames: The names of the song files.
+    @param engineName: The name of the engine used for every stage of the conversion.
+    
+    Returns:
+    @return MelodyIndex: The index of the songs.
+    
+    """
+    melodyIndex : MelodyIndex = MelodyIndex()
+    
+    for fileName in fileNames:
+        try:
+            songFile = open_song_file( fileName, 'r' )
+        except FileNotFoundError: # in case the file was not found.
+            raise FileNotFoundError(f'FILE {fileName} NOT FOUND')
+        except IOError: # in case of any errors in working with the file.
+            raise IOError(f"COULD NOT READ FILE {fileName}")
+        
+        with songFile, PROFILER.stage( 'melody_index' ):
+            try:
+                for ringtone in iterate_ringtones( songFile, engineName ):
+                    melodyIndex.add( ringtone.title, ringtone.notes )
+            except READ_ERRORS: # in case of any errors in working with the file, such as a corrupt compressed file.
+                raise IOError(f"COULD NOT READ FILE {fileName}")
+    
+    return melodyIndex
+
+class CatalogueDatabaseTestCase(unittest.TestCase):
+    """
+    
+    CatalogueDatabaseTestCase class checks that songs stored in the catalogue database come back unchanged.
+    
+    """
+    
+    def test1_store_and_query( self ):
+        """
+        
+        Description: 
+        The stored songs should have the titles and notes of convert_song_file(), and storing a file again
+        should replace its songs.
+        
+        """
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout( io.StringIO() ):
+            expected : dict = {}
+            for fileName in GOLDEN_INPUT_FILES:
+                titles, ringtoneNotes = convert_song_file( fileName, os.path.join( directory, 'play_ringtones.html' ) )
+                expected[fileName] = [ titles, [ [ note.to_list() for note in notes ] for notes in ringtoneNotes ] ]
+            
+            with contextlib.closing( open_catalogue( os.path.join( directory, 'catalogue.sqlite3' ) ) ) as connection:
+                for fileName in GOLDEN_INPUT_FILES + GOLDEN_INPUT_FILES[:1]:
+                    assert store_song_file( connection, fileName ) == len( expected[fileName][0] ), f"The songs of {fileName} were not all stored!"
+                
+                assert connection.execute( "PRAGMA journal_mode" ).fetchone()[0] == 'wal', "The database does not use write-ahead logging!"
+                assert { 'songs_title', 'songs_duration' } <= { name for name, in connection.execute( "SELECT name FROM sqlite_master WHERE type = 'index'" ) }, "The indexes are missing!"
+                
+                for fileName in GOLDEN_INPUT_FILES:
+                    songs : list = list( query_catalogue( connection, source = fileName ) )
+                    assert [ [ song.title for song in songs ], [ song.notes for song in songs ] ] == expected[fileName], f"The songs of {fileName} are wrong!"
+                
+                # a query is read lazily, and the conditions narrow it down.
+                allSongs : list = list( query_catalogue( connection ) )
+                assert not isinstance( query_catalogue( connection ), list ) and len( allSongs ) == sum( len( titles ) for titles, notes in expected.values() ), "The query is wrong!"
+                
+                longSongs : list = list( query_catalogue( connection, minimumDuration = 5.0 ) )
+                assert longSongs and all( song.duration >= 5.0 for song in longSongs ) and len( longSongs ) < len( allSongs ), "The duration condition is wrong!"
+                
+                prefix : str = allSongs[0].title[:3]
+                assert [ song.id for song in query_catalogue( connection, titlePrefix = prefix ) ] == [ song.id for song in allSongs if song.title.startswith( prefix ) ], "The title condition is wrong!"
+    
+    def test2_unreadable_song_files( self ):
+        """
+        
+        Description: 
+        Directories and corrupt compressed files should raise the IOError of convert_song_file(), and leave the
+        songs stored before unchanged.
+        
+        """
+        with open( GOLDEN_INPUT_FILES[1], 'rb' ) as songFile:
+            compressedBytes : bytes = gzip.compress( songFile.read() )
+        
+        with tempfile.TemporaryDirectory() as directory:
+            corruptFileName : str = os.path.join( directory, 'corrupt.txt' )
+            with open( corruptFileName, 'wb' ) as corruptFile:
+                corruptFile.write( compressedBytes[ : len(compressedBytes) // 2 ] )
+            
+            with contextlib.closing( open_catalogue( os.path.join( directory, 'catalogue.sqlite3' ) ) ) as connection:
+                storedSongs : int = store_song_file( connection, GOLDEN_INPUT_FILES[0] )
+                
+                for fileName in ( directory, corruptFileName ):
+                    with self.assertRaises( IOError ) as raised:
+                        store_song_file( connection, fileName )
+                    assert str( raised.exception ) == f"COULD NOT READ FILE {fileName}", f"The error of {fileName} is wrong!"
+                
+                assert len( list( query_catalogue( connection ) ) ) == storedSongs, "The stored songs were changed!"
+
+class ColumnarCatalogueTestCase(unittest.TestCase):
+    """
+    
+    ColumnarCatalogueTestCase class checks that a columnar catalogue maps back to the songs it was exported from.
+    
+    """
+    
+    @unittest.skipIf( not NUMPY_AVAILABLE, "NumPy is not installed" )
+    def test1_export_and_load( self ):
+        """
+        
+        Description: 
+        The mapped catalogue should have the titles and notes of convert_song_file(), and the vectorised
+        queries should agree with the same queries written over the nested lists.
+        
+        """
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout( io.StringIO() ):
+            titles, notes = convert_song_file( GOLDEN_INPUT_FILES[1], os.path.join( directory, 'play_ringtones.html' ) )
+            notes = [ [ note.to_list() for note in songNotes ] for songNotes in notes ]
+            catalogueFileName : str = os.path.join( directory, 'catalogue.npz' )
+            
+            assert export_columnar_catalogue( GOLDEN_INPUT_FILES[1], catalogueFileName ) == len(titles), "The songs were not all exported!"
+            catalogue : ColumnarCatalogue = load_columnar_catalogue( catalogueFileName )
+            
+            assert len(catalogue) == len(titles) and catalogue.titles() == titles, "The titles are wrong!"
+            assert [ catalogue.notes( index ) for index in range( len(catalogue) ) ] == notes, "The notes are wrong!"
+            assert not catalogue.durations.flags.owndata and not catalogue.durations.flags.writeable, "The arrays are not mapped from the file!"
+            
+            allPitches : list = [ playBack for song in notes for duration, playBack in song if playBack != -400 ]
+            pitchValues, pitchCounts = catalogue.pitch_histogram()
+            assert dict( zip( pitchValues.tolist(), pitchCounts.tolist() ) ) == { pitch : allPitches.count( pitch ) for pitch in set( allPitches ) }, "The pitch histogram is wrong!"
+            
+            lowest, highest = catalogue.pitch_ranges()
+            songPitches : list = [ [ playBack for duration, playBack in song if playBack != -400 ] or [ -400 ] for song in notes ]
+            assert lowest.tolist() == [ min( pitches ) for pitches in songPitches ] and highest.tolist() == [ max( pitches ) for pitches in songPitches ], "The pitch ranges are wrong!"
+            
+            np = import_numpy( "COMPARE THE SONG DURATIONS" )
+            assert np.allclose( catalogue.song_durations(), [ sum( duration for duration, playBack in song ) for song in notes ] ), "The song durations are wrong!"
+            assert catalogue.duration_histogram()[1].sum() == sum( len(song) for song in notes ), "The duration histogram is wrong!"
+    
+    @unittest.skipIf( not NUMPY_AVAILABLE, "NumPy is not installed" )
+    def test2_pitch_ranges_without_pitches( self ):
+        """
+        
+        Description: 
+        Songs made only of rests, or without notes, should get the rest value as their range.
+        
+        """
+        np = import_numpy( "BUILD A COLUMNAR CATALOGUE" )
+        catalogue : ColumnarCatalogue = ColumnarCatalogue( np.array( [ 0.5, 0.5, 0.25, 0.5 ] ), np.array( [ -400, 48, 60, -400 ], np.int32 ),
+                                                           np.array( [ 0, 1, 1, 3, 4 ] ), np.frombuffer( b'abcd', np.uint8 ), np.array( [ 0, 1, 2, 3, 4 ] ) )
+        lowest, highest = catalogue.pitch_ranges()
+        
+        assert lowest.tolist() == [ -400, -400, 48, -400 ] and highest.tolist() == [ -400, -400, 60, -400 ], "The pitch ranges are wrong!"
+        assert catalogue.titles() == [ 'a', 'b', 'c', 'd' ] and catalogue.song_durations().tolist() == [ 0.5, 0.0, 0.75, 0.5 ], "The songs are wrong!"
+
+class MelodyIndexTestCase(unittest.TestCase):
+    """
+    
+    MelodyIndexTestCase class checks that melodies are found in any key and at any tempo.
+    
+    """
+    
+    def test1_ngrams( self ):
+        """
+        
+        Description: 
+        Transposing, changing the tempo or adding rests should not change the n-grams of a melody.
+        
+        """
+        melody : list = [ [ 0.5, 48 ], [ 0.5, 48 ], [ 0.5, 55 ], [ 0.5, 55 ], [ 0.5, 57 ], [ 0.5, 57 ], [ 1.0, 55 ] ]
+        variant : list = [ [ 0.25, -400 ] ] + [ [ duration / 2, playBack + 5 ] for duration, playBack in melody[:3] ] + [ [ 0.5, -400 ] ] + [ [ duration / 2, playBack + 5 ] for duration, playBack in melody[3:] ]
+        
+        assert melody_ngrams( melody ) == melody_ngrams( variant ) and len( melody_ngrams( melody ) ) == 4, "The n-grams are not invariant!"
+        assert len( melody_ngrams( melody[:2] ) ) == 1 and melody_ngrams( melody[:2] ) != melody_ngrams( melody[:3] ), "Short melodies are wrong!"
+        assert len( melody_ngrams( [ [ 0.5, -400 ] ] ) ) == 0 and len( melody_ngrams( [ [ 0.5, 48 ], [ 0.5, -400 ] ] ) ) == 0, "Songs without intervals are wrong!"
+        
+        # leaps wider than an octave and a half are the same leap, but narrower ones are not.
+        assert melody_ngrams( [ [ 0.5, 36 ], [ 0.5, 56 ] ] ) == melody_ngrams( [ [ 0.5, 36 ], [ 0.5, 84 ] ] ) == melody_ngrams( [ [ 0.5, 36 ], [ 0.5, 54 ] ] ), "Wide leaps were not clamped!"
+        assert melody_ngrams( [ [ 0.5, 84 ], [ 0.5, 36 ] ] ) == melody_ngrams( [ [ 0.5, 54 ], [ 0.5, 36 ] ] ) != melody_ngrams( [ [ 0.5, 53 ], [ 0.5, 36 ] ] ), "Wide falls were not clamped!"
+    
+    def test2_search_similar( self ):
+        """
+        
+        Description: 
+        A transposed and faster Twinkle Twinkle should find the original in the essential files first, and
+        every song should find itself.
+        
+        """
+        with contextlib.redirect_stdout( io.StringIO() ):
+            melodyIndex : MelodyIndex = build_melody_index( GOLDEN_INPUT_FILES )
+            titles, notes = convert_song_file( GOLDEN_INPUT_FILES[0], os.path.join( tempfile.gettempdir(), 'play_ringtones.html' ) )
+        
+        twinkle : list = notes[ titles.index( 'Twinkle Twinkle 1' ) ]
+        matches : list = melodyIndex.search_similar( [ [ duration / 2, playBack if playBack == -400 else playBack + 7 ] for duration, playBack in twinkle ], 3 )
+        assert matches[0].title == 'Twinkle Twinkle 1' and matches[0].score == 1.0 and len(matches) <= 3, "The melody was not found!"
+        assert all( first.score >= second.score for first, second in zip( matches, matches[1:] ) ), "The matches are not ranked!"
+        
+        for song, songNotes in enumerate( notes ):
+            if melody_ngrams( songNotes ):
+                assert melodyIndex.search_similar( songNotes, 1 )[0].score == 1.0, f"Song {song} did not find itself!"
+        assert melodyIndex.search_similar( [ [ 0.5, -400 ] ] ) == [], "A song without notes should find nothing!"
+    
+    def test4_single_notes( self ):
+        """
+        
+        Description: 
+        Songs with a single pitched note have no melody, so a one-note query should not match unrelated one-note songs.
+        
+        """
+        melodyIndex : MelodyIndex = MelodyIndex()
+        for pitch in ( 48, 55, 60 ):
+            melodyIndex.add( f"Note {pitch}", [ [ 0.5, pitch ], [ 0.25, -400 ] ] )
+        melodyIndex.add( "Melody", [ [ 0.5, 48 ], [ 0.5, 50 ], [ 0.5, 52 ] ] )
+        
+        assert melodyIndex.search_similar( [ [ 1.0, 62 ] ] ) == [], "A one-note query matched the one-note songs!"
+        assert [ match.title for match in melodyIndex.search_similar( [ [ 0.5, 60 ], [ 0.5, 62 ], [ 0.5, 64 ] ] ) ] == [ "Melody" ], "The one-note songs were matched!"
+    
+    def test3_common_ngrams( self ):
+        """
+        
+        Description: 
+        N-grams shared by most songs should not give the candidates, but should still count when ranking them.
+        
+        """
+        melodyIndex : MelodyIndex = MelodyIndex()
+        scale : list = [ [ 0.25, pitch ] for pitch in ( 48, 50, 52, 53 ) ]
+        for song in range( MELODY_COMMON_MINIMUM + 1 ):
+            melodyIndex.add( f"Scale {song}", scale + [ [ 0.25, 60 + song % 7 ], [ 0.25, 50 + song % 11 ] ] )
+        melodyIndex.add( "Scale only", scale )
+        
+        matches : list = melodyIndex.search_similar( scale + [ [ 0.25, 62 ], [ 0.25, 52 ] ], 2 )
+        assert [ match.song for match in matches ] == [ 2, 79 ] and matches[0].score == 1.0, "The rare n-grams did not give the candidates!"
+        assert melodyIndex.search_similar( scale, 1 )[0].title == "Scale only", "A query made only of common n-grams is wrong!"
+
+### COMMAND LINE ###
+def parse_arguments( arguments : list = None ) -> argparse.Namespace:
+    """
+    
+    Description:
+    Parses the command line flags of the catalogue tools.
+    
+    Parameters:
+    @param arguments: The flags to parse. Defaults to the flags given to the program.
+    
+    Returns:
+    @return argparse.Namespace: The parsed flags.
+    
+    """
+    parser : argparse.ArgumentParser = argparse.ArgumentParser( description = '"Mamba Number Py" Ringtone Catalogue' )
+    parser.add_argument( '--profile', nargs = '?', const = 'table', choices = ['table', 'json'],
+                         help = 'time every stage and print a report at the end of the run (default format: table)' )
+    parser.add_argument( '--engine', default = 'reference', choices = sorted( ENGINES ), help = 'engine used for every stage of the conversion' )
+    parser.add_argument( '--database', default = 'catalogue.sqlite3', metavar = 'FILE', help = 'catalogue database used by --store and --query' )
+    parser.add_argument( '--store', nargs = '+', metavar = 'FILE', help = 'store every valid ringtone of the given files in the catalogue database' )
+    parser.add_argument( '--query', nargs = '?', const = '', metavar = 'TITLE_PREFIX', help = 'list the stored songs whose title starts with TITLE_PREFIX' )
+    parser.add_argument( '--export', metavar = 'FILE', help = 'export every valid ringtone of FILE as flat arrays to --export-output (needs NumPy)' )
+    parser.add_argument( '--export-output', default = 'catalogue.npz', metavar = 'FILE', help = 'columnar catalogue written by --export' )
+    parser.add_argument( '--similar', nargs = 2, metavar = ( 'FILE', 'SONG' ), help = 'list the songs of FILE and --similar-in whose melody is most like song number SONG of FILE' )
+    parser.add_argument( '--similar-in', nargs = '+', default = [], metavar = 'FILE', help = 'further song files searched by --similar' )
+    parser.add_argument( '--similar-count', type = int, default = 10, metavar = 'K', help = 'number of songs listed by --similar' )
+    
+    return parser.parse_args( arguments )
+
+def main( arguments : list = None ) -> None:
+    """
+    
+    Description:
+    Entry point of the catalogue tools. Applies the command line flags, or prints the usage when none is given.
+    
+    Parameters:
+    @param arguments: The command line flags. Defaults to the flags given to the program.
+    
+    """
+    parsedArguments : argparse.Namespace = parse_arguments( arguments )
+    
+    # the flag takes precedence over the RINGTONE_PROFILE environment variable.
+    reportFormat : str = parsedArguments.profile or os.environ.get( 'RINGTONE_PROFILE', '' )
+    if parsedArguments.profile:
+        PROFILER.enabled = True
+    
+    try:
+        with PROFILER.stage( 'total' ):
+            
+            # storing and querying the catalogue database.
+            if parsedArguments.store or parsedArguments.query is not None:
+                with contextlib.closing( open_catalogue( parsedArguments.database ) ) as connection:
+                    for fileName in parsedArguments.store or []:
+                        print(f"Stored {store_song_file( connection, fileName, parsedArguments.engine )} songs from \"{fileName}\".")
+                    
+                    if parsedArguments.query is not None:
+                        for song in query_catalogue( connection, parsedArguments.query ):
+                            print(f"{song.id} {song.title} ({song.duration:.2f} s, {len(song.notes)} notes)")
+            
+            # exporting writes the flat arrays.
+            elif parsedArguments.export:
+                exportedSongs : int = export_columnar_catalogue( parsedArguments.export, parsedArguments.export_output, parsedArguments.engine )
+                print(f"Exported {exportedSongs} songs to \"{parsedArguments.export_output}\".")
+            
+            # similarity search indexes the files and lists the closest melodies to one of their songs.
+            elif parsedArguments.similar:
+                fileName, song = parsedArguments.similar
+                melodyIndex : MelodyIndex = build_melody_index( [ fileName ] + parsedArguments.similar_in, parsedArguments.engine )
+                if not song.isdigit() or int(song) >= len(melodyIndex): # in case the song does not exist.
+                    raise ValueError(f"UNKNOWN SONG {song} IN {fileName}")
+                
+                with open_song_file( fileName, 'r' ) as songFile:
+                    query : Ringtone = next( itertools.islice( iterate_ringtones( songFile, parsedArguments.engine ), int(song), None ) )
+                for match in melodyIndex.search_similar( query.notes, parsedArguments.similar_count ):
+                    print(f"{match.score:.3f} {match.song} {match.title}")
+            
+            else:
+                parse_arguments( ['--help'] )
+    
+    finally:
+        # dumping the report even if the run was interrupted by an error.
+        if PROFILER.enabled:
+            sys.stderr.write( PROFILER.report( 'json' if reportFormat == 'json' else 'table' ) + "\n" )
+
+if __name__ == '__main__':
+    main()